@@ -1,242 +1,362 @@
-"""
-脚本名称: AI 助手 (ai_assistant.py)
-
-功能描述:
-    这是AI助手的交互层(门面)。
-    它负责启动和管理命令行界面 (CLI) 和图形用户界面 (Web UI)，
-    并将所有核心的AI逻辑处理委托给 `orchestrator.py`。
-
-使用方法:
-    与之前完全相同。
-    - CLI: `python ai_assistant.py`
-    - GUI: `python ai_assistant.py --gui`
-"""
-import os
-import sys
-import gradio as gr
-import argparse
-from dotenv import load_dotenv
-
-# 核心变化：导入新的调度器
-from orchestrator import Orchestrator
-
-# --- 辅助函数 (UI相关，保留在此) ---
-def history_to_chatbot_pairs(history):
-    """
-    将完整的消息历史转换为 Chatbot 组件需要的 [user, assistant] 列表。
-    """
-    pairs = []
-    for message in history:
-        role = message.get("role")
-        content = message.get("content", "")
-        if role == "user":
-            pairs.append([content, ""])
-        elif role == "assistant":
-            if pairs:
-                pairs[-1][1] = content
-            else:
-                pairs.append(["", content])
-    return pairs
-
-def format_session_status(session_id, history):
-    """
-    生成当前会话的状态文本，用于 GUI 顶部提示。
-    """
-    total_messages = len(history)
-    turns = sum(1 for msg in history if msg.get("role") == "assistant")
-    return f"当前会话：{session_id} ｜ 轮次：{turns} ｜ 消息数：{total_messages}"
-
-# --- 1. 配置程序所需的变量 ---
-load_dotenv()
-API_KEY = os.getenv("ALIYUN_API_KEY") 
-if not API_KEY: 
-    print("错误：未找到ALIYUN_API_KEY环境变量！") 
-    print("请在.env文件中设置您的API密钥") 
-    exit(1) 
-
-API_URL = os.getenv("ALIYUN_API_URL")
-if not API_URL:
-    print("错误：未找到ALIYUN_API_URL环境变量！")
-    print("请在.env文件中设置您的API地址")
-    exit(1)
-
-MODEL_NAME = os.getenv("ALIYUN_MODEL_NAME")
-if not MODEL_NAME:
-    print("警告：未找到ALIYUN_MODEL_NAME环境变量！")
-    print("请在.env文件中设置您的模型名称")
-    exit(1)
-
-MEMORY_ROOT = os.getenv("MEMORY_ROOT", "data/sessions")
-DEFAULT_SESSION_ID = "default"
-TEMPERATURE = float(os.getenv("TEMPERATURE",0.5))
-
-# --- 2. 初始化核心调度器 ---
-# 这是关键一步：创建Orchestrator的单一实例，它将管理所有后端逻辑
-orchestrator = Orchestrator(
-    api_key=API_KEY,
-    model_name=MODEL_NAME,
-    api_url=API_URL,
-    temperature=TEMPERATURE,
-    memory_root=MEMORY_ROOT
-)
-
-# --- 3. 命令行界面 (CLI) 启动逻辑 ---
-def start_cli():
-    """启动命令行版本的 AI 助手 (简化版)。"""
-    parser = argparse.ArgumentParser(
-        description="一个支持多种记忆模式和文件注入的命令行 AI 助手。",
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter 
-    )
-    parser.add_argument(
-        'file_path',
-        nargs='?',
-        default=None,
-        help="指定要加载到上下文中的文件路径。如果提供，AI会先阅读文件内容。"
-    )
-    parser.add_argument(
-        '-m', '--mode',
-        dest='memory_mode',
-        choices=['no', 'short', 'long'],
-        default='short',
-        help="设置记忆模式: 'no' (无记忆), 'short' (短期会话记忆), 'long' (长期持久化记忆)。"
-    )
-    parser.add_argument(
-        '--session',
-        dest='session_id',
-        default=DEFAULT_SESSION_ID,
-        help="指定会话名称，用于区分不同主题的长期记忆。"
-    )
-    args = parser.parse_args()
-    session_id = orchestrator.normalize_session_id(args.session_id)
-
-    print("🚀 正在启动命令行 AI 助手...")
-    print(f"🧠 记忆模式: {args.memory_mode}")
-    print(f"🗂 会话名称: {session_id}")
-
-    if args.memory_mode == 'long':
-        conversation_history = orchestrator.load_memory(session_id)
-        if conversation_history:
-            print(f"🗄 已加载会话 '{session_id}' 的历史消息，共 {len(conversation_history)} 条。")
-        else:
-            print(f"🗄 会话 '{session_id}' 暂无历史，将从头开始。")
-    else:
-        conversation_history = []
-        print("AI小助手：你好！一个新的旅程开始了。")
-
-    file_context = None
-    if args.file_path:
-        if os.path.isdir(args.file_path):
-            print("📁 检测到文件夹输入。")
-            print("此功能已移至新脚本 `note_process/batch_summarize.py`。")
-            print(f"   python note_process/batch_summarize.py \"{args.file_path}\"")
-            sys.exit(0)
-        elif os.path.isfile(args.file_path):
-            try:
-                with open(args.file_path, 'r', encoding='utf-8') as f:
-                    file_context = f.read()
-                print(f"📎 已加载文件 '{os.path.basename(args.file_path)}'。现在您可以基于该文件提问了。")
-            except FileNotFoundError:
-                print(f"❌ 错误：找不到文件 {args.file_path}。请检查路径是否正确。")
-                sys.exit(1)
-            except Exception as e:
-                print(f"❌ 处理文件时发生错误：{e}")
-                sys.exit(1)
-        else:
-            print(f"❌ 错误：'{args.file_path}' 既不是文件也不是文件夹。请提供有效路径。")
-            sys.exit(1)
-
-    while True:
-        user_input = input("你：")
-        if user_input.lower() in ["quit", "exit", "bye", "goodbye", "q", "e"]:
-            if args.memory_mode == 'long':
-                orchestrator.save_memory(session_id, conversation_history)
-            print("AI小助手：期待下次与你相见！")
-            break
-
-        # 核心变化：将所有工作委托给 orchestrator
-        conversation_history = orchestrator.handle_cli_request(
-            user_input=user_input,
-            conversation_history=conversation_history,
-            memory_mode=args.memory_mode,
-            session_id=session_id,
-            file_context=file_context
-        )
-        
-        print("\n" + "-"*30)
-
-# --- 4. 图形用户界面 (GUI) 启动逻辑 ---
-def start_gui():
-    """启动 Gradio 图形用户界面 (简化版)。"""
-    print("🚀 正在启动 Gradio 图形界面...")
-
-    initial_session = orchestrator.normalize_session_id(DEFAULT_SESSION_ID)
-    initial_history = orchestrator.load_memory(initial_session)
-    initial_pairs = history_to_chatbot_pairs(initial_history)
-    initial_status = format_session_status(initial_session, initial_history)
-    print(f"🗄 GUI 会话 '{initial_session}' 已加载 {len(initial_history)} 条消息。")
-
-    def chat_response(user_input, chatbot_history, conversation_state, session_id):
-        """Gradio的响应函数，现在是一个围绕Orchestrator的薄包装。"""
-        # 更新本地状态和UI
-        # 用户消息将由 orchestrator 添加到 history，此处不再重复添加
-        chatbot_history.append([user_input, ""])
-        yield (chatbot_history, conversation_state, gr.update(value=format_session_status(session_id, conversation_state)))
-
-        # 核心变化：将流式响应的逻辑委托给 orchestrator
-        full_response = ""
-        for response_chunk in orchestrator.handle_gui_request(user_input, conversation_state, session_id):
-            full_response = response_chunk
-            chatbot_history[-1][1] = full_response
-            yield (chatbot_history, conversation_state, gr.update(value=format_session_status(session_id, conversation_state)))
-
-    def switch_session(requested_session, conversation_history, current_session_id):
-        """会话切换，委托给 orchestrator。"""
-        new_session, new_history = orchestrator.switch_gui_session(
-            requested_session, conversation_history, current_session_id
-        )
-        chatbot_pairs = history_to_chatbot_pairs(new_history)
-        status_text = format_session_status(new_session, new_history)
-        return (gr.update(value=new_session), gr.update(value=chatbot_pairs), new_history, new_session, gr.update(value=status_text))
-
-    with gr.Blocks(title="AI 助手") as app:
-        conversation_state = gr.State(value=list(initial_history))
-        session_state = gr.State(value=initial_session)
-
-        gr.Markdown("# 🤖 AI 助手")
-        gr.Markdown("一个由阿里通义千问驱动的智能助手。")
-
-        with gr.Row():
-            session_input = gr.Textbox(
-                label="会话名称",
-                value=initial_session,
-                placeholder="例如：工作",
-                scale=5,
-            )
-            load_button = gr.Button("切换会话", variant="secondary", scale=1)
-
-        session_status = gr.Markdown(initial_status)
-        chatbot = gr.Chatbot(label="通义千问", height=500, value=initial_pairs)
-
-        with gr.Row():
-            txt_input = gr.Textbox(show_label=False, lines=3, placeholder="询问任何问题", scale=8)
-            btn_submit = gr.Button("发送", variant="primary", scale=1)
-
-        load_button.click(
-            switch_session,
-            inputs=[session_input, conversation_state, session_state],
-            outputs=[session_input, chatbot, conversation_state, session_state, session_status],
-        )
-
-        submit_inputs = [txt_input, chatbot, conversation_state, session_state]
-        submit_outputs = [chatbot, conversation_state, session_status]
-        txt_input.submit(chat_response, submit_inputs, submit_outputs).then(lambda: "", [], [txt_input])
-        btn_submit.click(chat_response, submit_inputs, submit_outputs).then(lambda: "", [], [txt_input])
-
-    app.launch()
-
-# --- 5. 主程序执行入口 ---
-if __name__ == "__main__":
-    if '--gui' in sys.argv:
-        start_gui()
-    else:
-        start_cli()
+"""
+脚本名称: AI 助手 (ai_assistant.py)
+
+功能描述:
+    这是AI助手的交互层(门面)。
+    它负责启动和管理命令行界面 (CLI) 和图形用户界面 (Web UI)，
+    并将所有核心的AI逻辑处理委托给 `orchestrator.py`。
+
+使用方法:
+    与之前完全相同。
+    - CLI: `python ai_assistant.py`
+    - GUI: `python ai_assistant.py --gui`
+"""
+import argparse
+import asyncio
+import functools
+import mmap
+import os
+import stat
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from dotenv import load_dotenv
+
+# 核心变化：导入新的调度器
+from orchestrator import Orchestrator
+
+# --- 辅助函数 (UI相关，保留在此) ---
+@functools.lru_cache(maxsize=16)
+def _status_text(session_id, turns, total_messages):
+    """拼接状态文本；参数都是可哈希的标量，直接用 lru_cache 记忆结果。"""
+    return f"当前会话：{session_id} ｜ 轮次：{turns} ｜ 消息数：{total_messages}"
+
+
+@dataclass
+class ConvState:
+    """
+    GUI 会话状态：消息列表加一个增量维护的轮次计数。
+
+    以前每次刷新状态文本都要把整个历史扫一遍数 assistant 消息，
+    长会话下这是 O(N)；现在只在加载/切换会话时数一次，之后每完成
+    一轮对话把计数加一即可，状态刷新变成 O(1)。
+    """
+    messages: list
+    turns: int = 0
+
+    @classmethod
+    def from_history(cls, messages):
+        """从加载的历史构建状态（唯一一次 O(N) 的轮次统计）。"""
+        turns = sum(1 for msg in messages if msg.get("role") == "assistant")
+        return cls(messages, turns)
+
+
+def format_session_status(session_id, state):
+    """生成当前会话的状态文本，用于 GUI 顶部提示。全部是 O(1) 读取。"""
+    return _status_text(session_id, state.turns, len(state.messages))
+
+# --- 1. 配置程序所需的变量 ---
+@dataclass(frozen=True)
+class AppConfig:
+    """
+    集中存放从环境变量读取的配置。
+
+    用 frozen 数据类代替一组模块级全局变量：所有 os.getenv 查找只在
+    构建时发生一次，之后通过属性访问读取，配置也不会被意外修改。
+    """
+    api_key: str
+    api_url: str
+    model_name: str
+    temperature: float
+    memory_root: str
+
+    @classmethod
+    def from_env(cls):
+        """从 .env / 环境变量中读取配置，缺少必要项时给出提示并退出。
+
+        只在真正启动（CLI 或 GUI）时调用，不在导入时执行：
+        单纯 import 本模块（例如在 REPL 里试验辅助函数）不会因为
+        缺少环境变量而被 exit(1) 打断。
+        """
+        load_dotenv()
+        api_key = os.getenv("ALIYUN_API_KEY")
+        if not api_key:
+            print("错误：未找到ALIYUN_API_KEY环境变量！")
+            print("请在.env文件中设置您的API密钥")
+            exit(1)
+
+        api_url = os.getenv("ALIYUN_API_URL")
+        if not api_url:
+            print("错误：未找到ALIYUN_API_URL环境变量！")
+            print("请在.env文件中设置您的API地址")
+            exit(1)
+
+        model_name = os.getenv("ALIYUN_MODEL_NAME")
+        if not model_name:
+            print("警告：未找到ALIYUN_MODEL_NAME环境变量！")
+            print("请在.env文件中设置您的模型名称")
+            exit(1)
+
+        return cls(
+            api_key=api_key,
+            api_url=api_url,
+            model_name=model_name,
+            temperature=float(os.getenv("TEMPERATURE", 0.5)),
+            memory_root=os.getenv("MEMORY_ROOT", "data/sessions"),
+        )
+
+
+DEFAULT_SESSION_ID = "default"
+# 超过 1 MiB 的上下文文件改用 mmap 读取，避免一次性 read() 的额外拷贝
+_LARGE_FILE_THRESHOLD = 1 << 20
+# 退出口令集合：frozenset 的哈希查找是 O(1)，且不用每轮循环重建列表
+_EXIT_TOKENS = frozenset(("quit", "exit", "bye", "goodbye", "q", "e"))
+# CLI 每轮之间打印的分隔线，提前拼好避免每轮重新分配字符串
+_SEP = "\n" + "-" * 30
+
+# --- 2. 初始化核心调度器 ---
+def _build_orchestrator():
+    """读取配置并创建 Orchestrator 实例（CLI 与 GUI 共用的启动步骤）。"""
+    config = AppConfig.from_env()
+    return Orchestrator(
+        api_key=config.api_key,
+        model_name=config.model_name,
+        api_url=config.api_url,
+        temperature=config.temperature,
+        memory_root=config.memory_root
+    )
+
+# --- 3. 命令行参数解析 ---
+def parse_args():
+    """
+    统一解析命令行参数（CLI 与 GUI 共用）。
+
+    以前的做法是在模块入口扫描一遍 sys.argv 找 '--gui'，再由 start_cli
+    内部的 ArgumentParser 重新解析一遍；现在只构建一个解析器、只扫一遍。
+    """
+    parser = argparse.ArgumentParser(
+        description="一个支持多种记忆模式和文件注入的 AI 助手 (CLI / Web UI)。",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        '--gui',
+        action='store_true',
+        help="启动 Gradio 图形界面，而不是命令行界面。"
+    )
+    parser.add_argument(
+        'file_path',
+        nargs='?',
+        default=None,
+        help="指定要加载到上下文中的文件路径。如果提供，AI会先阅读文件内容。"
+    )
+    parser.add_argument(
+        '-m', '--mode',
+        dest='memory_mode',
+        choices=['no', 'short', 'long'],
+        default='short',
+        help="设置记忆模式: 'no' (无记忆), 'short' (短期会话记忆), 'long' (长期持久化记忆)。"
+    )
+    parser.add_argument(
+        '--session',
+        dest='session_id',
+        default=DEFAULT_SESSION_ID,
+        help="指定会话名称，用于区分不同主题的长期记忆。"
+    )
+    return parser.parse_args()
+
+# --- 4. 命令行界面 (CLI) 启动逻辑 ---
+def start_cli(args):
+    """启动命令行版本的 AI 助手（真正的主循环在协程 _cli_main 里）。"""
+    asyncio.run(_cli_main(args))
+
+
+async def _cli_main(args):
+    """CLI 主循环协程。
+
+    读输入用 asyncio.to_thread 包住阻塞的 input()，流式响应走
+    orchestrator 的异步路径：事件循环不会被任何一步整体卡死，
+    CLI 和 GUI 也共用同一个 httpx 连接池。
+    """
+    orchestrator = _build_orchestrator()
+    session_id = orchestrator.normalize_session_id(args.session_id)
+
+    print("🚀 正在启动命令行 AI 助手...")
+    print(f"🧠 记忆模式: {args.memory_mode}")
+    print(f"🗂 会话名称: {session_id}")
+
+    if args.memory_mode == 'long':
+        conversation_history = orchestrator.load_memory(session_id)
+        if conversation_history:
+            print(f"🗄 已加载会话 '{session_id}' 的历史消息，共 {len(conversation_history)} 条。")
+        else:
+            print(f"🗄 会话 '{session_id}' 暂无历史，将从头开始。")
+    else:
+        conversation_history = []
+        print("AI小助手：你好！一个新的旅程开始了。")
+
+    file_context = None
+    if args.file_path:
+        # 一次 os.stat 同时回答“是文件夹还是文件”两个问题，
+        # 避免 os.path.isdir + os.path.isfile 各自发起一次系统调用
+        try:
+            file_stat = os.stat(args.file_path)
+        except OSError:
+            file_stat = None
+        if file_stat is not None and stat.S_ISDIR(file_stat.st_mode):
+            print("📁 检测到文件夹输入。")
+            print("此功能已移至新脚本 `note_process/batch_summarize.py`。")
+            print(f"   python note_process/batch_summarize.py \"{args.file_path}\"")
+            sys.exit(0)
+        elif file_stat is not None and stat.S_ISREG(file_stat.st_mode):
+            try:
+                if file_stat.st_size > _LARGE_FILE_THRESHOLD:
+                    # 大文件走 mmap：由内核按页映射文件内容，只做一次整体解码，
+                    # 避免普通 read() 在读取过程中产生的中间缓冲区拷贝
+                    with open(args.file_path, 'rb') as f:
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                            file_context = mm[:].decode('utf-8')
+                else:
+                    file_context = Path(args.file_path).read_text(encoding='utf-8')
+                print(f"📎 已加载文件 '{os.path.basename(args.file_path)}'。现在您可以基于该文件提问了。")
+            except FileNotFoundError:
+                print(f"❌ 错误：找不到文件 {args.file_path}。请检查路径是否正确。")
+                sys.exit(1)
+            except Exception as e:
+                print(f"❌ 处理文件时发生错误：{e}")
+                sys.exit(1)
+        else:
+            print(f"❌ 错误：'{args.file_path}' 既不是文件也不是文件夹。请提供有效路径。")
+            sys.exit(1)
+
+    if file_context is not None:
+        # 文档作为固定的 system 消息插在历史开头（只插一次）：
+        # 每轮请求的前缀保持字节不变，既不重复保存整份文档，
+        # 也让服务端的前缀缓存在多轮对话中持续命中
+        if not (conversation_history and conversation_history[0].get("role") == "system"):
+            conversation_history.insert(0, {
+                "role": "system",
+                "content": f"请基于以下参考文档回答用户的问题。\n参考文档({os.path.basename(args.file_path)}):\n{file_context}",
+            })
+
+    while True:
+        user_input = await asyncio.to_thread(input, "你：")
+        if user_input.strip().casefold() in _EXIT_TOKENS:
+            if args.memory_mode == 'long':
+                orchestrator.save_memory(session_id, conversation_history)
+            print("AI小助手：期待下次与你相见！")
+            break
+
+        # 核心变化：将所有工作委托给 orchestrator
+        conversation_history = await orchestrator.handle_cli_request(
+            user_input=user_input,
+            conversation_history=conversation_history,
+            memory_mode=args.memory_mode,
+            session_id=session_id
+        )
+        
+        print(_SEP)
+
+# --- 5. 图形用户界面 (GUI) 启动逻辑 ---
+def start_gui():
+    """启动 Gradio 图形用户界面 (简化版)。"""
+    # 延迟导入：Gradio 会连带拉起 FastAPI/uvicorn/PIL 等一大串依赖，
+    # 只在真正启动 GUI 时才导入，纯 CLI 启动可省下数秒的导入时间
+    import gradio as gr
+
+    print("🚀 正在启动 Gradio 图形界面...")
+
+    orchestrator = _build_orchestrator()
+    # 并发预载最近用过的几个会话：之后点“切换会话”基本直接命中内存缓存
+    preloaded = asyncio.run(orchestrator.preload_memory())
+    if preloaded:
+        print(f"🗄 已预载 {len(preloaded)} 个最近会话。")
+    initial_session = orchestrator.normalize_session_id(DEFAULT_SESSION_ID)
+    initial_state = ConvState.from_history(orchestrator.load_memory(initial_session))
+    initial_status = format_session_status(initial_session, initial_state)
+    print(f"🗄 GUI 会话 '{initial_session}' 已加载 {len(initial_state.messages)} 条消息。")
+
+    async def chat_response(user_input, chatbot_history, conversation_state, session_id):
+        """Gradio的响应函数，现在是一个围绕Orchestrator的薄包装（异步生成器）。"""
+        # Chatbot 用 type="messages" 后，展示列表就是 role/content 字典，
+        # 和存储的历史同构，不再需要转换成 [user, assistant] 配对。
+        # 用户消息将由 orchestrator 添加到 history，此处只更新展示列表
+        chatbot_history.append({"role": "user", "content": user_input})
+        assistant_view = {"role": "assistant", "content": ""}
+        chatbot_history.append(assistant_view)
+        # 状态文本只在消息数变化时才会不同，因此整个流式过程中
+        # 只需计算两次（开始前和结束后），而不是每收到一个数据块就重新扫描历史
+        status_update = gr.update(value=format_session_status(session_id, conversation_state))
+        yield (chatbot_history, conversation_state, status_update)
+
+        # 核心变化：将流式响应的逻辑委托给 orchestrator
+        messages = conversation_state.messages
+        before = len(messages)
+        async for response_chunk in orchestrator.handle_gui_request(user_input, messages, session_id):
+            # 原地改最后一条 assistant 消息的内容，不重建整个展示列表
+            assistant_view["content"] = response_chunk
+            yield (chatbot_history, conversation_state, status_update)
+
+        # 正常完成时 orchestrator 追加了用户和助手两条消息，算作新的一轮；
+        # 出错时只追加了用户消息，轮次不变
+        if len(messages) - before == 2:
+            conversation_state.turns += 1
+        final_status = gr.update(value=format_session_status(session_id, conversation_state))
+        yield (chatbot_history, conversation_state, final_status)
+
+    def switch_session(requested_session, conversation_state, current_session_id):
+        """会话切换，委托给 orchestrator。"""
+        new_session, new_history = orchestrator.switch_gui_session(
+            requested_session, conversation_state.messages, current_session_id
+        )
+        new_state = ConvState.from_history(new_history)
+        status_text = format_session_status(new_session, new_state)
+        # 展示列表和历史同构，直接把加载的消息交给 Chatbot
+        return (gr.update(value=new_session), gr.update(value=new_history), new_state, new_session, gr.update(value=status_text))
+
+    with gr.Blocks(title="AI 助手") as app:
+        # 直接把加载的历史交给 gr.State：初始化后没有别处引用这个列表，
+        # 防御性的 list(...) 拷贝只是白付一次 O(N) 分配
+        conversation_state = gr.State(value=initial_state)
+        session_state = gr.State(value=initial_session)
+
+        gr.Markdown("# 🤖 AI 助手")
+        gr.Markdown("一个由阿里通义千问驱动的智能助手。")
+
+        with gr.Row():
+            session_input = gr.Textbox(
+                label="会话名称",
+                value=initial_session,
+                placeholder="例如：工作",
+                scale=5,
+            )
+            load_button = gr.Button("切换会话", variant="secondary", scale=1)
+
+        session_status = gr.Markdown(initial_status)
+        # type="messages"：组件直接消费 role/content 字典，前端可以按
+        # 消息做增量渲染，省去经典配对格式整表重建/重传的开销
+        chatbot = gr.Chatbot(label="通义千问", height=500, type="messages", value=initial_state.messages)
+
+        with gr.Row():
+            txt_input = gr.Textbox(show_label=False, lines=3, placeholder="询问任何问题", scale=8)
+            btn_submit = gr.Button("发送", variant="primary", scale=1)
+
+        load_button.click(
+            switch_session,
+            inputs=[session_input, conversation_state, session_state],
+            outputs=[session_input, chatbot, conversation_state, session_state, session_status],
+        )
+
+        submit_inputs = [txt_input, chatbot, conversation_state, session_state]
+        submit_outputs = [chatbot, conversation_state, session_status]
+        txt_input.submit(chat_response, submit_inputs, submit_outputs).then(lambda: "", [], [txt_input])
+        btn_submit.click(chat_response, submit_inputs, submit_outputs).then(lambda: "", [], [txt_input])
+
+    app.launch()
+
+# --- 6. 主程序执行入口 ---
+if __name__ == "__main__":
+    cli_args = parse_args()
+    if cli_args.gui:
+        start_gui()
+    else:
+        start_cli(cli_args)
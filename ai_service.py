@@ -13,9 +13,63 @@
         - `ALIYUN_MODEL_NAME`: 要使用的 AI 模型名称。
         - `TEMPERATURE`: 控制生成文本的随机性（可选，默认为 0.5）。
 """
+import asyncio
+import hashlib
 import os
+import random
+import re
 import requests
+import httpx
 import json
+from pathlib import Path
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+    _json_loads = orjson.loads  # C 实现，直接接受 bytes，比标准库快数倍
+except ImportError:  # 未安装 orjson 时退回标准库，行为一致
+    orjson = None
+    _json_loads = json.loads
+
+# 流式帧里我们只关心 delta.content 一个字段，但整帧 JSON 还带着
+# role/finish_reason 等别的内容。快路径直接在字节里找不含转义符的
+# "content":"..."：命中时跳过整帧解析，只解码正文本身
+_CONTENT_RE = re.compile(rb'"content"\s*:\s*"([^"\\]*)"')
+
+
+def _delta_content(payload):
+    """从一帧 SSE 载荷中取出增量文本。
+
+    正文含 \\ 转义（换行、引号等）或快路径没匹配上时，退回完整的
+    JSON 解析，保证语义与以前逐帧解析完全一致。
+    """
+    m = _CONTENT_RE.search(payload)
+    if m is not None:
+        return m.group(1).decode("utf-8")
+    response_json = _json_loads(payload)
+    # 安全检查：确保 'choices' 列表存在且不为空
+    if response_json.get("choices") and len(response_json["choices"]) > 0:
+        return response_json["choices"][0]["delta"].get("content", "")
+    return ""
+
+
+# 值得退避重试的状态码：限流与网关侧的瞬时故障
+_RETRYABLE_STATUSES = frozenset((429, 502, 503, 504))
+# 异步路径最多尝试的次数（含首次请求）
+_MAX_TRIES = 3
+
+
+class StreamError(RuntimeError):
+    """
+    流式请求失败时抛出的异常。
+
+    以前的做法是把错误文案当成普通内容 yield 出去，调用方再对每个
+    数据块做子串匹配来判断是否出错——既要每个 token 扫两遍字符串，
+    回答里恰好出现“网络错误”字样时还会被误判。改成异常后，
+    错误走异常通道，正文通道里只有正文。
+    """
+    pass
+
 
 class AIAssistantService:
     """
@@ -38,6 +92,181 @@ class AIAssistantService:
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}"
         }
+        # 请求体模板：除 messages 外的字段在整个进程生命周期内不变，
+        # 每次请求只做一次浅合并，而不是重建整个字典字面量
+        self._req_template = {
+            "model": self.model_name,
+            "temperature": self.temperature,
+            "stream": True,
+        }
+        # 同步请求复用同一个 Session：保持 TCP/TLS 长连接，
+        # 每轮对话省掉一次握手（约 1 个 RTT + TLS），首 token 来得更快；
+        # max_retries 顺带吸收偶发的 5xx，不至于直接报“网络错误”
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504)),
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        # 异步客户端按需创建（首次在事件循环中使用时），供 GUI 并发场景使用
+        self._async_client = None
+        # 并发闸门，同样按需创建：限制同时在途的 LLM 请求数，
+        # 多个浏览器会话同时提问时排队而不是一拥而上触发限流
+        self._sem = None
+        # 精确匹配的响应缓存：只在 temperature == 0（输出确定）时启用。
+        # 批量总结里模板化的提示词、开发调试时反复发的同一个问题，
+        # 都可以直接用缓存结果，省掉一整次 API 调用
+        self._cache = {}
+        self._cache_dir = Path(os.getenv("LLM_CACHE_DIR", "data/llm_cache"))
+
+    def _cache_key(self, history):
+        """请求的缓存键：对 (模型, 消息, 温度) 的规范化 JSON 取 sha256。"""
+        payload = {"model": self.model_name, "messages": history, "temperature": self.temperature}
+        if orjson is not None:
+            raw = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+        else:
+            raw = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
+
+    def _cache_get(self, key):
+        """先查内存缓存，未命中再查磁盘缓存目录；都没有返回 None。"""
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        try:
+            cached = (self._cache_dir / f"{key}.txt").read_text(encoding="utf-8")
+        except OSError:
+            return None
+        self._cache[key] = cached
+        return cached
+
+    def _cache_put(self, key, text):
+        """写入内存与磁盘缓存；磁盘写失败只当没有缓存，不影响主流程。"""
+        self._cache[key] = text
+        try:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            (self._cache_dir / f"{key}.txt").write_text(text, encoding="utf-8")
+        except OSError:
+            pass
+
+    def close(self):
+        """关闭同步 Session 的连接池（异步客户端请用 aclose 关闭）。"""
+        self._session.close()
+
+    async def aclose(self):
+        """关闭所有底层连接，含异步客户端；需在事件循环内调用。"""
+        self._session.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_async_client(self):
+        """懒创建共享的 httpx.AsyncClient（带连接池与长连接复用）。"""
+        if self._async_client is None:
+            limits = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+            # 流式响应的读超时设为 None：生成长回答时两段数据之间可能间隔很久
+            timeout = httpx.Timeout(60.0, read=None)
+            try:
+                self._async_client = httpx.AsyncClient(http2=True, timeout=timeout, limits=limits)
+            except ImportError:
+                # 未安装 h2 扩展时退回 HTTP/1.1，功能不受影响
+                self._async_client = httpx.AsyncClient(timeout=timeout, limits=limits)
+        if self._sem is None:
+            # 默认最多 8 个并发请求，可用 LLM_CONCURRENCY 环境变量调节
+            self._sem = asyncio.Semaphore(int(os.getenv("LLM_CONCURRENCY", "8")))
+        return self._async_client
+
+    async def astream_chat_completion(self, history):
+        """
+        stream_chat_completion 的异步版本，供 Gradio 的异步处理函数使用。
+
+        基于共享的 httpx.AsyncClient 发起非阻塞请求：事件循环在等待
+        网络数据时可以去服务其他会话，使单进程的 Web UI 能同时
+        处理多个用户的流式对话，而不是被一条 socket 读阻塞住。
+        """
+        data = {**self._req_template, "messages": history}
+
+        # temperature == 0 时输出是确定的，先查精确匹配缓存
+        cache_key = self._cache_key(history) if self.temperature == 0 else None
+        if cache_key is not None:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        client = self._get_async_client()
+        try:
+            for attempt in range(_MAX_TRIES):
+                retry_delay = None
+                parts = []
+                # 并发闸门：同时在途的请求数有上界，其余请求在此排队；
+                # 对限流端点来说排队比一拥而上再吃 429 重试要快
+                async with self._sem:
+                    async with client.stream("POST", self.api_url, headers=self.headers, json=data) as response:
+                        if response.status_code in _RETRYABLE_STATUSES and attempt < _MAX_TRIES - 1:
+                            # 指数退避加少量抖动；服务端给了 Retry-After 则听它的
+                            retry_delay = min(30.0, 0.5 * 2 ** attempt) + random.random() * 0.1
+                            retry_after = response.headers.get("Retry-After")
+                            if retry_after is not None:
+                                try:
+                                    retry_delay = max(retry_delay, float(retry_after))
+                                except ValueError:
+                                    pass
+                        else:
+                            response.raise_for_status()
+                            # 在字节层手工切分 SSE 行：框架字节（"data:" 前缀、换行）
+                            # 完全不做 UTF-8 解码，只有 JSON 载荷交给解析器；
+                            # 配合 orjson 直接吃 bytes，省去每行一次的 decode。
+                            # 缓冲用 bytearray：bytes 的 `buf += chunk` 每次都要整体
+                            # 拷贝一份（O(n²)），bytearray 原地 extend、处理完的前缀
+                            # 用 del 一次性丢掉，增长始终是线性的
+                            buf = bytearray()
+                            done = False
+                            async for chunk in response.aiter_bytes():
+                                buf.extend(chunk)
+                                start = 0
+                                while not done:
+                                    nl = buf.find(b"\n", start)
+                                    if nl < 0:
+                                        break  # 余下的是不完整的行，留到下一块
+                                    line = buf[start:nl].strip()
+                                    start = nl + 1
+                                    if not line.startswith(b"data:"):
+                                        continue
+                                    payload = line[5:].strip()
+                                    if payload == b"[DONE]":
+                                        done = True
+                                        break
+                                    content = _delta_content(payload)
+                                    if content:
+                                        if cache_key is not None:
+                                            parts.append(content)
+                                        yield content
+                                if done:
+                                    break
+                                if start:
+                                    del buf[:start]
+                if retry_delay is None:
+                    if cache_key is not None:
+                        self._cache_put(cache_key, "".join(parts))
+                    return
+                # 退避等待放在闸门外，不占用并发名额
+                await asyncio.sleep(retry_delay)
+        except httpx.HTTPError as e:
+            raise StreamError(f"哎呀，网络错误！无法连接到服务器。错误详情：{e}") from e
+        except StreamError:
+            raise
+        except Exception as e:
+            raise StreamError(f"发生未知错误：{e}") from e
 
     def stream_chat_completion(self, history):
         """
@@ -46,33 +275,57 @@ class AIAssistantService:
         :param history: 一个包含对话消息的列表。
         :return: 一个生成器，逐块(chunk)产生 AI 的回复内容。
         """
-        data = {
-            "model": self.model_name,
-            "messages": history,
-            "temperature": self.temperature,
-            "stream": True,
-        }
+        data = {**self._req_template, "messages": history}
+
+        # 同异步路径：temperature == 0 时先查精确匹配缓存
+        cache_key = self._cache_key(history) if self.temperature == 0 else None
+        if cache_key is not None:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                yield cached
+                return
 
+        parts = []
         try:
-            response = requests.post(self.api_url, headers=self.headers, json=data, stream=True)
+            response = self._session.post(self.api_url, json=data, stream=True)
             response.raise_for_status()
 
-            for line in response.iter_lines():
-                if line:
-                    decoded_line = line.decode('utf-8')
-                    if decoded_line.startswith("data:"):
-                        json_str = decoded_line[len("data: "):]
-                        if json_str.strip() == "[DONE]":
-                            break
-                        response_json = json.loads(json_str)
-                        # 安全检查：确保 'choices' 列表存在且不为空
-                        if response_json.get("choices") and len(response_json["choices"]) > 0:
-                            content = response_json["choices"][0]["delta"].get("content", "")
-                            # 确保只在有实际内容时才 yield
-                            if content:
-                                yield content
+            # 与异步版本同一套字节层解析：iter_content 一次读 64KiB，
+            # 在 bytearray 里找换行切行，框架部分完全不做 UTF-8 解码，
+            # 也省掉 iter_lines 内部的逐行 decode 和小块读取
+            buf = bytearray()
+            done = False
+            for chunk in response.iter_content(chunk_size=65536):
+                buf.extend(chunk)
+                start = 0
+                while not done:
+                    nl = buf.find(b"\n", start)
+                    if nl < 0:
+                        break  # 余下的是不完整的行，留到下一块
+                    line = buf[start:nl].strip()
+                    start = nl + 1
+                    if not line.startswith(b"data:"):
+                        continue
+                    payload = line[5:].strip()
+                    if payload == b"[DONE]":
+                        done = True
+                        break
+                    content = _delta_content(payload)
+                    # 确保只在有实际内容时才 yield
+                    if content:
+                        if cache_key is not None:
+                            parts.append(content)
+                        yield content
+                if done:
+                    break
+                if start:
+                    del buf[:start]
+            if cache_key is not None:
+                self._cache_put(cache_key, "".join(parts))
         except requests.exceptions.RequestException as e:
-            yield f"\n哎呀，网络错误！无法连接到服务器。错误详情：{e}"
+            raise StreamError(f"哎呀，网络错误！无法连接到服务器。错误详情：{e}") from e
+        except StreamError:
+            raise
         except Exception as e:
             error_details = response.text if 'response' in locals() else "无响应内容"
-            yield f"发生未知错误：{e}\n服务器响应：{error_details}"
+            raise StreamError(f"发生未知错误：{e}\n服务器响应：{error_details}") from e
@@ -1,9 +1,19 @@
+import numpy as np  # 导入numpy库（pandas 的底层数值库），用于构造整数位置数组。
 import pandas as pd  # 导入pandas库，并使用pd作为别名，这是一个广泛接受的惯例。
 # pandas库是Python中用于数据分析的核心库，它提供了DataFrame这个强大的数据结构。
 # 可处理多种格式的数据文件，包括Excel、CSV、SQL等。
 import sys  # 导入sys模块，用于访问命令行参数。
 import os  # 导入os模块，用于处理文件路径和文件系统操作。
 
+# 更快的 Excel 解析后端：python-calamine 是原生（Rust）实现的 XLSX 读取器，
+# 读取大表比默认的 openpyxl 快一个数量级。这里只探测它是否安装，
+# 未安装时保持 None，读取时自动退回 pandas 的默认引擎。
+try:
+    import python_calamine  # noqa: F401  只探测是否可用，不直接使用
+    _EXCEL_ENGINE = "calamine"
+except ImportError:
+    _EXCEL_ENGINE = None
+
 def parse_arguments():
     """
     功能: 解析和验证命令行参数。
@@ -58,6 +68,31 @@ def parse_arguments():
         
     return input_excel_path, sheet_to_read, sheet_display_name
 
+def _read_excel_streaming(file_path, sheet_name):
+    """
+    功能: 用 openpyxl 的只读模式逐行流式读取工作表，返回 DataFrame。
+    - read_only=True 不为整个工作表构建单元格对象树，逐行产出值元组，
+      大文件的加载时间和内存占用都远小于默认模式；
+    - data_only=True 读取公式的缓存计算结果而不是公式本身。
+    第一行作为表头，其余行直接喂给 DataFrame 构造器。
+    """
+    from openpyxl import load_workbook
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        # sheet 参数既可能是索引（整数）也可能是名称（字符串）
+        if isinstance(sheet_name, int):
+            ws = wb.worksheets[sheet_name]
+        else:
+            ws = wb[sheet_name]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        return pd.DataFrame(rows, columns=list(header))
+    finally:
+        wb.close()
+
+
 def read_excel_data(file_path, sheet_name, sheet_display_name):
     """
     功能: 从指定的Excel文件和工作表中读取数据。
@@ -69,10 +104,28 @@ def read_excel_data(file_path, sheet_name, sheet_display_name):
     """
     # pd.read_excel() 是一个函数，用于读取Excel文件。
     # 这行代码的执行结果是创建一个DataFrame对象，你可以把它想象成内存中的一个Excel表格。
-    try: 
-        df = pd.read_excel(file_path, sheet_name=sheet_name)
+    try:
+        if _EXCEL_ENGINE is not None:
+            try:
+                df = pd.read_excel(file_path, sheet_name=sheet_name, engine=_EXCEL_ENGINE)
+            except (ValueError, ImportError):
+                # pandas 版本过旧不认识该引擎等情况：退回默认引擎重读
+                df = pd.read_excel(file_path, sheet_name=sheet_name)
+        else:
+            # 没有 calamine 时：xlsx/xlsm 走 openpyxl 的只读流式路径，
+            # 其他格式（如 .xls）仍交给 pandas 的默认引擎
+            ext = os.path.splitext(file_path)[1].lower()
+            if ext in ('.xlsx', '.xlsm'):
+                df = _read_excel_streaming(file_path, sheet_name)
+            else:
+                df = pd.read_excel(file_path, sheet_name=sheet_name)
         print(f"✅ 成功读取文件：'{file_path}' 中的 {sheet_display_name} 工作表。")
         return df
+    except (KeyError, IndexError) as ke:
+        # 流式路径里找不到指定的工作表时抛出 KeyError/IndexError
+        print(f"❌ 错误：在文件 '{file_path}' 中未找到指定的 {sheet_display_name} 工作表。")
+        print(f"请检查Sheet名称或索引是否正确。详细错误：{ke}")
+        sys.exit(1)
     except ValueError as ve:
         # 捕获当指定的sheet_name不存在时可能抛出的ValueError。
         print(f"❌ 错误：在文件 '{file_path}' 中未找到指定的 {sheet_display_name} 工作表。")
@@ -94,44 +147,40 @@ def process_duplicate_rows(df):
         - df: 原始的DataFrame。
     返回: 一个处理过（复制了行）的新DataFrame。
     """
-    # 创建一个空的Python列表，命名为processed_rows。
-    # 我们将用这个列表来收集所有的行，包括原始行和需要复制的新行。
-    processed_rows = []
-
-    # df.iterrows() 是一个非常有用的方法，它会逐行遍历DataFrame (df)。
-    # 在每一次循环中，它会返回两个值：
-    # - index: 当前行的行标签（或行号），默认从0开始。
-    # - row: 一个包含当前行所有数据的Series对象。你可以通过列名从row中获取单元格的值。
-    for index, row in df.iterrows():
-        # 无论如何，我们都希望保留原始的每一行数据，所以先把当前行(row)添加到我们的结果列表(processed_rows)中。
-        processed_rows.append(row)
-        
-        # --- 核心逻辑：根据"新增记录"列的值来复制行 ---
-        # row.get('新增记录', 0) 从当前行(row)中获取'新增记录'这一列的值。
-        # 使用 .get() 方法的好处是，如果'新增记录'这一列不存在，或者该单元格为空，它会返回一个默认值0，而不是报错。
-        add_num = row.get('新增记录', 0)
+    # 整个复制逻辑用向量化操作一次完成，不再用 df.iterrows() 逐行遍历：
+    # iterrows() 每行都要现场构造一个 Series 对象，几十万行的表就是
+    # 几十万次对象分配，时间都耗在解释器里而不是数据本身上。
 
-        # pd.notnull(add_num) 用来检查我们获取到的值是否是有效值（不是空值NaN）。
-        if pd.notnull(add_num):
-            try:
-                # 尝试将获取到的值转换为整数。如果这一格里是文本（比如"abc"），转换会失败，并触发except。
-                add_num = int(add_num)
-                # 只有当需要新增的记录数大于0时，才执行复制操作。
-                if add_num > 0:
-                    # 使用 for 循环来精确地复制指定的次数。
-                    # 比如，如果 add_num 是 2，这个循环就会执行 2 次。
-                    for _ in range(add_num):
-                        # 在循环中，把当前行(row)再次添加到结果列表中。
-                        processed_rows.append(row)
-            except (ValueError, TypeError):
-                # 如果int()转换失败（例如，值是文本或无法转换的格式），程序会跳转到这里。
-                # pass 语句表示什么也不做，直接忽略这个错误，继续处理下一行。
-                pass
-    
-    # 当所有行都处理完毕后，processed_rows列表里就包含了所有原始行和被复制的新行。
-    # pd.DataFrame(processed_rows) 会使用这个列表来创建一个全新的DataFrame。
+    # 如果没有'新增记录'这一列，每一行都只保留原样（与原先 .get 默认 0 的效果一致）。
+    if '新增记录' not in df.columns:
+        return df.reset_index(drop=True)
+
+    # 计算每一行要“额外新增”的份数：
+    # - pd.to_numeric(..., errors='coerce') 把文本等无法转换的值变成 NaN（对应原先 int() 失败被忽略的行）；
+    # - fillna(0) 把空值当作 0（不新增）；
+    # - astype('int64') 向零取整，和 int() 的行为一致；
+    # - clip(lower=0) 把负数压到 0（原先也只在大于 0 时才复制）。
+    extra = (
+        pd.to_numeric(df['新增记录'], errors='coerce')
+        .fillna(0)
+        .astype('int64')
+        .clip(lower=0)
+    )
+
+    # 快速通道：没有任何一行需要新增（常见于只做局部修改的表），
+    # 一次 C 层的向量化判断就能跳过整个展开+复制的过程。
+    if not extra.to_numpy().any():
+        return df.reset_index(drop=True)
+
+    # 每一行最终要出现的次数 = 额外新增的份数 + 原始行本身的一份
+    counts = extra + 1
+
+    # 用 np.repeat 把行的整数位置（0..N-1）按次数展开，再用 df.take
+    # 一次性按位置取出所有行。take 直接走按位置的 C 层 gather，
+    # 跳过了 .loc 的标签对齐机制，也不用构造一个展开后的临时索引对象。
     # .reset_index(drop=True) 会为新的DataFrame生成一个干净的、从0开始的连续索引，并丢弃旧的索引。
-    result_df = pd.DataFrame(processed_rows).reset_index(drop=True)
+    positions = np.repeat(np.arange(len(df), dtype=np.intp), counts.to_numpy())
+    result_df = df.take(positions).reset_index(drop=True)
     return result_df
 
 def save_dataframe_to_excel(df, original_input_path):
@@ -155,7 +204,18 @@ def save_dataframe_to_excel(df, original_input_path):
 
     # 将最终处理好的DataFrame (df) 保存到一个新的Excel文件中。
     # index=False 参数告诉pandas在保存时，不要把DataFrame的行索引（0, 1, 2...）也写到Excel文件里，这通常是我们想要的结果。
-    df.to_excel(output_excel_path, index=False)
+    # 优先用 xlsxwriter 的 constant_memory 模式：一边生成一边把行写进
+    # 磁盘并立即丢弃，内存占用不随行数增长；默认的 openpyxl 写入
+    # 则要先在内存里攒出整个工作簿。未安装 xlsxwriter 时退回默认引擎。
+    try:
+        df.to_excel(
+            output_excel_path,
+            index=False,
+            engine='xlsxwriter',
+            engine_kwargs={'options': {'constant_memory': True}},
+        )
+    except ImportError:
+        df.to_excel(output_excel_path, index=False)
 
     print(f"🎉 处理完成！结果已保存到：'{output_excel_path}'")
 
@@ -1,16 +1,43 @@
+import asyncio
+import atexit
 import json
+import os
+import threading
 from pathlib import Path
 from typing import Dict, List, Optional
 
 Message = Dict[str, str]
 
+# 与 ai_service 一样优先用 orjson：C 实现的序列化/解析比标准库快数倍，
+# 长会话整体重写和启动加载的停顿明显变短；未安装时退回标准库，格式不变
+try:
+    import orjson
+
+    def _dump_line(message: Message) -> bytes:
+        """把一条消息序列化成带换行的 JSONL 字节行。"""
+        return orjson.dumps(message, option=orjson.OPT_APPEND_NEWLINE)
+
+    _loads = orjson.loads
+except ImportError:
+    orjson = None
+
+    def _dump_line(message: Message) -> bytes:
+        return (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+
+    _loads = json.loads
+
 
 class MemoryStore:
     """
-    使用 JSON 文件保存聊天历史的简单实现。
+    使用 JSONL（每行一条消息）文件保存聊天历史的简单实现。
 
     这里只保留一个类，方便初学者理解：构造函数负责准备存储目录，
-    `load` 读取历史，`save` 写回历史，其余逻辑都在内部完成。
+    `load` 读取历史，`append` 追加单条消息，`save` 整体重写，
+    其余逻辑都在内部完成。
+
+    采用 JSONL 的原因：每轮对话只需在文件末尾追加新消息（O(1)），
+    而不是把整个历史重新序列化写盘（O(历史长度)）；即使进程意外
+    退出，之前追加的行也都是完整的 JSON，不会产生截断的历史文件。
     """
 
     def __init__(self, root_dir: str):
@@ -20,32 +47,148 @@ class MemoryStore:
         :param root_dir: 保存所有会话文件的根目录路径。
         """
         self.root = Path(root_dir)               # 转成 Path 对象，便于后续操作
-        self.root.mkdir(parents=True, exist_ok=True)  # 若目录不存在则创建（支持多级）
+        # 目录推迟到第一次真正写盘时才创建：构造实例（以及只读场景）
+        # 不碰文件系统，省掉每次启动都做的一次 stat/mkdir
+        self._root_ready = False
+        # 已加载会话的内存缓存：同一会话只从磁盘读一次
+        self._cache: Dict[str, List[Message]] = {}
+        # 防抖写盘：save() 先记下待写的历史，短暂合并窗口后再真正落盘
+        self._pending: Dict[str, List[Message]] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+        # 进程退出前把所有待写的会话冲刷到磁盘，避免丢掉最后一次保存
+        atexit.register(self.flush_all)
 
     def load(self, session_id: Optional[str]) -> List[Message]:
         """
         根据会话 ID 读取历史记录。
 
-        - 会话 ID 会被转换成 root_dir 下的文件名（例如 default.json）。
+        - 会话 ID 会被转换成 root_dir 下的文件名（例如 default.jsonl）。
+        - 若只存在旧版的 default.json（整体 JSON 数组），则读取后自动
+          迁移成 JSONL，之后的追加都落在新文件上。
         - 如果文件不存在，则返回空列表，代表这是一次全新的对话。
+        - 已加载过的会话直接命中内存缓存，不再访问磁盘。
         """
-        target = self._file_path(session_id)
+        safe_id = self.normalize_session_id(session_id)
+        cached = self._cache.get(safe_id)
+        if cached is not None:
+            return cached
+
+        target = self._file_path(safe_id)
         if target.exists():
-            return self._load_file(target)
-        return []
+            history = self._load_jsonl(target)
+        else:
+            legacy = self._legacy_file_path(safe_id)
+            if legacy.exists():
+                history = self._load_file(legacy)
+                self.save(safe_id, history)  # 一次性迁移为 JSONL
+            else:
+                history = []
+        self._cache[safe_id] = history
+        return history
+
+    async def aload(self, session_id: Optional[str]) -> List[Message]:
+        """
+        load 的异步版本：磁盘读取放进线程池执行。
 
-    def save(self, session_id: Optional[str], history: List[Message]) -> None:
+        事件循环可以同时等待多个 aload，把每个文件的读取和 JSON 解析
+        重叠起来，而不是一个接一个地串行读。
         """
-        将历史记录保存到磁盘。
+        safe_id = self.normalize_session_id(session_id)
+        cached = self._cache.get(safe_id)
+        if cached is not None:
+            return cached
+        return await asyncio.to_thread(self.load, safe_id)
+
+    async def preload(self, limit: int = 8) -> List[str]:
+        """并发预载最近使用的几个会话到内存缓存，返回预载的会话 ID 列表。
 
-        `ensure_ascii=False` 能保留中文字符，`indent=2` 让生成的 JSON 更易读。
+        GUI 启动时调用一次：之后切换会话基本都命中 _cache，
+        冷启动的总耗时也从“各会话读取之和”变成“最慢的那一个”。
         """
+        recent = self.list_sessions()[:limit]
+        if recent:
+            await asyncio.gather(*(self.aload(safe_id) for safe_id in recent))
+        return recent
+
+    def list_sessions(self) -> List[str]:
+        """列出磁盘上已有的会话 ID，按最近修改时间从新到旧排序。"""
+        entries = []
+        try:
+            with os.scandir(self.root) as it:
+                for entry in it:
+                    if entry.name.endswith(".jsonl") and entry.is_file():
+                        entries.append((entry.stat().st_mtime, entry.name[:-6]))
+        except FileNotFoundError:
+            return []
+        entries.sort(reverse=True)
+        return [name for _, name in entries]
+
+    def save(self, session_id: Optional[str], history: List[Message], delay: float = 1.0) -> None:
+        """
+        将完整历史整体重写到磁盘（用于会话切换等需要覆盖的场景）。
+
+        写盘是防抖的：短时间内的多次 save 会合并成一次真正的写入
+        （delay 秒后由后台定时器执行），退出时由 atexit 兜底冲刷。
+        """
+        safe_id = self.normalize_session_id(session_id)
+        with self._lock:
+            self._cache[safe_id] = history
+            self._pending[safe_id] = history
+            old_timer = self._timers.pop(safe_id, None)
+            if old_timer is not None:
+                old_timer.cancel()
+            timer = threading.Timer(delay, self._flush, args=(safe_id,))
+            timer.daemon = True
+            self._timers[safe_id] = timer
+            timer.start()
+
+    def _flush(self, safe_id: str) -> None:
+        """把某个会话待写的历史真正写到磁盘（先写临时文件再原子替换）。"""
+        with self._lock:
+            self._timers.pop(safe_id, None)
+            history = self._pending.pop(safe_id, None)
+        if history is None:
+            return
+        self._ensure_root()
+        target = self._file_path(safe_id)
+        tmp_path = target.with_suffix(target.suffix + ".tmp")
+        with tmp_path.open("wb") as handle:
+            for message in history:
+                handle.write(_dump_line(message))
+        # os.replace 是原子的：读者要么看到旧文件，要么看到完整的新文件
+        os.replace(tmp_path, target)
+
+    def flush_all(self) -> None:
+        """冲刷所有尚未落盘的会话，进程退出前由 atexit 自动调用。"""
+        with self._lock:
+            pending_ids = list(self._pending)
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+        for safe_id in pending_ids:
+            self._flush(safe_id)
+
+    def append(self, session_id: Optional[str], message: Message) -> None:
+        """
+        向会话文件末尾追加单条消息。
+
+        这是每轮对话的常规保存路径：写入量只与这条消息的大小有关，
+        与历史总长度无关。
+        """
+        self._ensure_root()
         target = self._file_path(session_id)
-        with target.open("w", encoding="utf-8") as handle:
-            json.dump(history, handle, ensure_ascii=False, indent=2)
+        with target.open("ab") as handle:
+            handle.write(_dump_line(message))
 
     # --- 以下是内部辅助方法 ---
 
+    def _ensure_root(self) -> None:
+        """第一次写盘前创建存储目录；exist_ok 让重复调用是无害的。"""
+        if not self._root_ready:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._root_ready = True
+
     def normalize_session_id(self, session_id: Optional[str]) -> str:
         """
         清洗会话名称，保证生成合法的文件名。
@@ -68,13 +211,26 @@ class MemoryStore:
         空字符串会退回到默认会话 `default`。
         """
         safe_id = self.normalize_session_id(session_id)
+        return self.root / f"{safe_id}.jsonl"
+
+    def _legacy_file_path(self, session_id: Optional[str]) -> Path:
+        """旧版整体 JSON 数组格式的文件路径（仅用于读取迁移）。"""
+        safe_id = self.normalize_session_id(session_id)
         return self.root / f"{safe_id}.json"
 
+    @staticmethod
+    def _load_jsonl(path: Path) -> List[Message]:
+        """辅助函数：逐行读取 JSONL 文件并返回消息列表。"""
+        try:
+            # 整体读成 bytes 再按行切：不做文本解码，每行直接交给解析器
+            return [_loads(line) for line in path.read_bytes().splitlines() if line.strip()]
+        except FileNotFoundError:
+            return []
+
     @staticmethod
     def _load_file(path: Path) -> List[Message]:
-        """辅助函数：读取 JSON 文件并返回列表。"""
+        """辅助函数：读取旧版 JSON 数组文件并返回列表。"""
         try:
-            with path.open("r", encoding="utf-8") as handle:
-                return json.load(handle)
+            return _loads(path.read_bytes())
         except FileNotFoundError:
             return []
@@ -30,8 +30,10 @@
 """
 import os
 import sys
-import re
 import argparse
+import mmap
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # --- 动态添加项目根目录到 sys.path ---
@@ -69,79 +71,122 @@ if not MODEL_NAME:
 
 TEMPERATURE = float(os.getenv("TEMPERATURE", 0.5))
 
+# 标题标记是固定的字面量：查找用 str.find / bytes.find 就够了，
+# 不需要正则引擎（原来的 SUMMARY_PATTERN 只是包了一层 re.escape）
 SUMMARY_HEADING_MARKER = "# 总结提炼\n"
-SUMMARY_PATTERN = re.compile(rf"({re.escape(SUMMARY_HEADING_MARKER)})", re.DOTALL)
+# 标记的 UTF-8 字节形式：扫描阶段直接在字节层查找，不解码文件内容
+_MARKER_BYTES = SUMMARY_HEADING_MARKER.encode('utf-8')
+
+# 打印锁：多个工作线程并发处理文件时，保证每个文件的几行日志
+# 一次性完整输出，不会和其他文件的日志穿插在一起
+_PRINT_LOCK = threading.Lock()
 
 # --- 2. 核心功能函数 ---
-def process_folder_for_summaries(folder_path, ai_service, prompt_template):
+def _summarize_file(file_path, ai_service, prompt_template):
+    """
+    处理单个 Markdown 文件，返回 'processed' / 'skipped' / 'error'。
+
+    该函数会在线程池中并发执行：每个文件的日志先攒在列表里，
+    处理完后在打印锁内一次性输出。
+    """
+    file_name = os.path.basename(file_path)
+    lines = [f"--- 文件: {file_name} ---"]
+    try:
+        # 先用 mmap 在字节层找标题标记：大多数文件没有标记，直接跳过，
+        # 连一次完整的 UTF-8 解码都不用做；只有命中的文件才整体解码
+        content = None
+        with open(file_path, 'rb') as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                mm = None  # 空文件无法建立映射，按没有标记处理
+            if mm is not None:
+                try:
+                    if mm.find(_MARKER_BYTES) >= 0:
+                        content = mm[:].decode('utf-8')
+                finally:
+                    mm.close()
+
+        if content is None:
+            lines.append(f"   ⏭️ 跳过：未找到总结提炼的标题标记 ('{SUMMARY_HEADING_MARKER.strip()}')。")
+            status = 'skipped'
+        else:
+            summary_prompt = prompt_template.format(activeNote=content)
+            temp_history = [{"role": "user", "content": summary_prompt}]
+
+            ai_summary = "".join(ai_service.stream_chat_completion(temp_history))
+
+            if not ai_summary.strip():
+                lines.append(f"   ⏭️ 跳过：AI 未返回有效内容。")
+                status = 'skipped'
+            else:
+                # --- 将模型名称附加到总结末尾 ---
+                # 1. 从 AI 服务实例中获取当前使用的模型名称
+                model_name = ai_service.model_name
+                # 2. 创建一个格式化的、包含模型信息的 Markdown 字符串
+                model_info_str = f"\n\n> 总结由 *{model_name}* 生成"
+                # 3. 将 AI 总结、模型信息和必要的换行符拼接成最终要插入的内容
+                content_to_insert = ai_summary.strip() + model_info_str + "\n"
+
+                # 标记位置已知，直接按下标拼接，把内容插到“# 总结提炼”标题下方：
+                # 比正则替换少跑一遍匹配引擎，也没有反向引用展开的开销
+                insert_at = content.find(SUMMARY_HEADING_MARKER) + len(SUMMARY_HEADING_MARKER)
+                new_content = content[:insert_at] + content_to_insert + content[insert_at:]
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    f.write(new_content)
+                lines.append(f"   ✅ 成功插入内容并更新文件。")
+                status = 'processed'
+    except Exception as e:
+        lines.append(f"   ❌ 处理文件时发生错误: {e}")
+        status = 'error'
+
+    with _PRINT_LOCK:
+        print("\n" + "\n".join(lines))
+    return status
+
+
+def process_folder_for_summaries(folder_path, ai_service, prompt_template, concurrency=8):
     """
     遍历指定文件夹下的所有Markdown文件，查找总结提炼区域，
     如果该区域为空，则调用AI进行总结并写入文件。
+
+    以前是一个文件接一个文件地串行处理，整个循环大部分时间都在
+    等待 AI 响应（每个文件数秒）；现在用线程池同时发起多个请求，
+    让多次 LLM 等待互相重叠，总耗时从“各文件之和”变成约 1/并发数。
     :param folder_path: 要处理的文件夹路径。
-    :param ai_service: AI 服务实例。
+    :param ai_service: AI 服务实例（Session 连接池可被多线程复用）。
     :param prompt_template: 用于生成AI请求的提示词模板。
+    :param concurrency: 同时处理的文件数上限。
     """
     print(f"📁 开始扫描文件夹：'{folder_path}'")
-    processed_count = 0
-    skipped_count = 0
-    error_count = 0
 
     if "{activeNote}" not in prompt_template:
         print("⚠️ 警告：提供的提示词模板中未找到 '{activeNote}' 占位符。AI可能无法获取文件内容。")
 
+    # 先收集所有待处理的 Markdown 文件，再交给线程池
+    md_paths = []
     for root, _, files in os.walk(folder_path):
         for file_name in files:
-            if not file_name.lower().endswith('.md'):
-                continue
-
-            file_path = os.path.join(root, file_name)
-            print(f"\n--- 正在处理文件: {file_name} ---")
-
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-
-                match = SUMMARY_PATTERN.search(content)
-                if not match:
-                    print(f"   ⏭️ 跳过：未找到总结提炼的标题标记 ('{SUMMARY_HEADING_MARKER.strip()}')。")
-                    skipped_count += 1
-                    continue
-
-                summary_prompt = prompt_template.format(activeNote=content)
-                temp_history = [{"role": "user", "content": summary_prompt}]
-                
-                print("   🤖 正在请求 AI 生成内容...")
-                ai_summary = "".join(ai_service.stream_chat_completion(temp_history))
-
-                if not ai_summary.strip():
-                    print(f"   ⏭️ 跳过：AI 未返回有效内容。")
-                    skipped_count += 1
-                    continue
-
-                # --- 新增：将模型名称附加到总结末尾 ---
-                # 1. 从 AI 服务实例中获取当前使用的模型名称
-                model_name = ai_service.model_name
-                # 2. 创建一个格式化的、包含模型信息的 Markdown 字符串
-                model_info_str = f"\n\n> 总结由 *{model_name}* 生成"
-                # 3. 将 AI 总结、模型信息和必要的换行符拼接成最终要插入的内容
-                content_to_insert = ai_summary.strip() + model_info_str + "\n"
+            if file_name.lower().endswith('.md'):
+                md_paths.append(os.path.join(root, file_name))
+
+    counts = {'processed': 0, 'skipped': 0, 'error': 0}
+    if md_paths:
+        workers = max(1, min(concurrency, len(md_paths)))
+        print(f"🤖 共 {len(md_paths)} 个 Markdown 文件，并发数 {workers}。")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for status in executor.map(
+                _summarize_file,
+                md_paths,
+                (ai_service for _ in md_paths),
+                (prompt_template for _ in md_paths),
+            ):
+                counts[status] += 1
 
-                # 使用正则表达式替换，将拼接好的完整内容插入到“# 总结提炼”标题下方
-                new_content = SUMMARY_PATTERN.sub(r"\1" + content_to_insert, content, 1)
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
-                print(f"   ✅ 成功插入内容并更新文件。")
-                processed_count += 1
-                    
-            except Exception as e:
-                print(f"   ❌ 处理文件时发生错误: {e}")
-                error_count += 1
-                continue
-    
     print("\n--- 批处理完成 ---")
-    print(f"成功更新: {processed_count} 个文件")
-    print(f"跳过: {skipped_count} 个文件")
-    print(f"失败: {error_count} 个文件")
+    print(f"成功更新: {counts['processed']} 个文件")
+    print(f"跳过: {counts['skipped']} 个文件")
+    print(f"失败: {counts['error']} 个文件")
     print("------------------")
 
 # --- 3. 主程序入口 ---
@@ -151,6 +196,7 @@ if __name__ == "__main__":
     prompt_group = parser.add_mutually_exclusive_group()
     prompt_group.add_argument('--prompt', dest='prompt_string', help="直接在命令行中提供提示词模板。")
     prompt_group.add_argument('--prompt-file', dest='prompt_file_path', help="从指定文件中加载提示词模板。")
+    parser.add_argument('--concurrency', type=int, default=8, help="同时处理的文件数（默认 8）。")
     args = parser.parse_args()
 
     if not os.path.isdir(args.folder_path):
@@ -175,4 +221,4 @@ if __name__ == "__main__":
         prompt_template = user_prompt.strip() or default_prompt
 
     ai_service = AIAssistantService(API_KEY, MODEL_NAME, API_URL, TEMPERATURE)
-    process_folder_for_summaries(args.folder_path, ai_service, prompt_template)
+    process_folder_for_summaries(args.folder_path, ai_service, prompt_template, args.concurrency)
@@ -22,8 +22,21 @@
 """
 import os # 导入 os 模块以处理文件路径和检查文件是否存在，os 的作用是提供与操作系统进行交互的功能
 import sys # 导入 sys 模块以处理命令行参数，sys的作用是提供对解释器使用或维护的一些变量和函数的访问
+from concurrent.futures import ProcessPoolExecutor, as_completed # 进程池：绕开 GIL 并行转换多个文件
 from markitdown import MarkItDown # 导入 MarkItDown 库，而不是导入整个 markitdown 模块
 
+# MarkItDown 实例整个进程只创建一次：初始化要装配各种格式的转换器，
+# 批量转换文件夹时逐文件重建纯属浪费；惰性创建则让 --help 等
+# 不真正转换的路径完全不付初始化成本
+_converter = None
+
+def _get_converter():
+    """惰性创建并复用同一个 MarkItDown 实例。"""
+    global _converter
+    if _converter is None:
+        _converter = MarkItDown()
+    return _converter
+
 # --- 1. 将转换逻辑封装成一个函数 ---
 def convert_file(file_path):
     """
@@ -40,16 +53,16 @@ def convert_file(file_path):
         # 打印当前正在转换的文件名，os.path.basename可以从完整路径中提取出文件名
         print(f"⏳ 正在转换: {os.path.basename(file_path)}...")
         
-        # 初始化 MarkItDown 转换器 并执行转换
-        md = MarkItDown() # 创建 MarkItDown 实例
+        # 获取共享的 MarkItDown 转换器并执行转换
+        md = _get_converter()
         conversion_result = md.convert(file_path) # 调用convert方法
         
         # 生成输出文件名
         base_name, _ = os.path.splitext(file_path) 
         output_file_path = base_name + ".md" # 生成新的路径名
         
-        # 写入 Markdown 文件
-        with open(output_file_path, "w", encoding="utf-8") as f:
+        # 写入 Markdown 文件（1MiB 写缓冲：大文档凑满大块再落盘，减少系统调用）
+        with open(output_file_path, "w", encoding="utf-8", buffering=1 << 20) as f:
             f.write(conversion_result.text_content)
         
         print(f"✅ 转换成功 -> {os.path.basename(output_file_path)}")
@@ -75,11 +88,26 @@ if __name__ == "__main__":
     # 判断输入是文件还是文件夹
     if os.path.isdir(input_path):
         print(f"📁 开始处理文件夹: {input_path}")
+        # 先收集所有文件路径，再交给进程池并行转换。
+        # 转换是 CPU 密集型工作（XML 解析、PDF 抽取），受 GIL 限制
+        # 多线程帮不上忙，所以按进程扇出；每个工作进程各自有一份
+        # 模块级的 _converter，惰性创建后在该进程内复用。
+        all_paths = []
         # os.walk 会遍历文件夹下的所有子文件夹和文件
         for root, dirs, files in os.walk(input_path):
             for file in files:
-                full_path = os.path.join(root, file)
+                all_paths.append(os.path.join(root, file))
+        if len(all_paths) <= 1:
+            # 只有一个（或没有）文件时不值得起进程池
+            for full_path in all_paths:
                 convert_file(full_path)
+        else:
+            workers = min(os.cpu_count() or 1, len(all_paths))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(convert_file, p) for p in all_paths]
+                # as_completed 按完成顺序返回，转换日志在各进程内打印
+                for future in as_completed(futures):
+                    future.result()  # 重新抛出工作进程里的意外异常
         print("\n🎉 所有文件处理完毕！")
     elif os.path.isfile(input_path):
         # 如果是单个文件，直接调用转换函数
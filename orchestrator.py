@@ -1,7 +1,56 @@
 # d:\Documents\Assistant\orchestrator.py
-from ai_service import AIAssistantService
+from ai_service import AIAssistantService, StreamError
 from memory_store import MemoryStore
+import io
 import os
+import sys
+import time
+
+# 发送窗口的默认上限：最多带多少条历史消息、多少个字符。
+# 字符数是 token 预算的粗略代理（中英文混排大约 1~3 字符/token），
+# 足以避免请求随会话长度无限膨胀、最终撑爆上下文窗口
+_WINDOW_MAX_MESSAGES = 40
+_WINDOW_MAX_CHARS = 24000
+# 窗口起点以“块”为单位移动：丢弃数量向上取整到 8 的倍数。
+# 起点每 8 条消息才挪一次，其间每轮发送的前缀字节完全一致，
+# 服务端的前缀/KV 缓存就能在多轮之间持续命中；逐轮滑动的窗口
+# 则每轮都会换一个前缀，缓存几乎永远不命中
+_WINDOW_TRIM_BLOCK = 8
+
+
+def _window(history, max_messages=_WINDOW_MAX_MESSAGES, max_chars=_WINDOW_MAX_CHARS,
+            trim_block=_WINDOW_TRIM_BLOCK):
+    """
+    把要发送给模型的历史裁剪到一个有界窗口。
+
+    - 开头的 system 消息（注入的文档等）始终保留；
+    - 其余消息从最新往回数，直到条数或字符预算用完；
+    - 实际丢弃的条数向上取整到 trim_block 的倍数，宁可多丢几条
+      也让窗口起点保持稳定（对前缀缓存友好）；
+    - 历史只增不改：完整历史仍由调用方持有并照常持久化，
+      这里只影响发送的载荷。改写旧消息会让服务端 KV 复用彻底失效。
+    """
+    split = 0
+    while split < len(history) and history[split].get("role") == "system":
+        split += 1
+
+    rest = history[split:]
+    kept = 0
+    chars = 0
+    for message in reversed(rest):
+        if kept >= max_messages:
+            break
+        chars += len(message.get("content", ""))
+        # 至少保留最新一条消息，哪怕它单独就超出了字符预算
+        if kept and chars > max_chars:
+            break
+        kept += 1
+
+    drop = len(rest) - kept
+    if drop == 0:
+        return history
+    drop = min(((drop + trim_block - 1) // trim_block) * trim_block, len(rest) - 1)
+    return history[:split] + rest[drop:]
 
 class Orchestrator:
     """
@@ -19,60 +68,113 @@ class Orchestrator:
         )
         self.memory_store = MemoryStore(root_dir=memory_root)
 
-    def handle_cli_request(self, user_input, conversation_history, memory_mode, session_id, file_context=None):
-        """处理来自CLI的单次请求，并流式打印响应。"""
-        
-        if file_context:
-            final_input = f"""请基于以下文档内容来回答我的问题。
----
-文档内容:
-{file_context}
----
-我的问题是：{user_input}
-"""
-        else:
-            final_input = user_input
-        
-        conversation_history.append({"role": "user", "content": final_input})
+    async def handle_cli_request(self, user_input, conversation_history, memory_mode, session_id):
+        """处理来自CLI的单次请求，并流式打印响应。
+
+        注入的文档不再拼进每轮的用户消息，而是由 start_cli 作为
+        固定的 system 消息放在历史开头：每轮请求只新增用户的问题本身，
+        字节稳定的前缀也让服务端的 KV/前缀缓存能够命中。
+
+        和 GUI 一样走 httpx 的异步流式接口：CLI 主循环现在是协程，
+        读输入和等网络都不再把整个线程卡死。
+        """
+        user_message = {"role": "user", "content": user_input}
 
         if memory_mode == 'no':
-            history_to_send = [conversation_history[-1]]
+            # 无记忆模式不往 conversation_history 里存任何东西：
+            # 反正每轮都只发送当前这一条，留着整份转写只会白占内存；
+            # 但开头如有注入文档的 system 消息，仍需随每轮一起发送
+            if conversation_history and conversation_history[0].get("role") == "system":
+                history_to_send = [conversation_history[0], user_message]
+            else:
+                history_to_send = [user_message]
         else:
-            history_to_send = conversation_history
+            conversation_history.append(user_message)
+            history_to_send = _window(conversation_history)
 
-        print(f"AI助手：", end="")
-        full_response = ""
+        print(f"AI助手：", end="", flush=True)
+        # 回复累积用 列表 + 一次 join：full_response += chunk 在长回复下
+        # 可能退化成 O(N^2) 的反复拷贝，append + join 始终是线性的
+        parts = []
         has_error = False
-        for chunk in self.ai_service.stream_chat_completion(history_to_send):
-            if "网络错误" in chunk or "未知错误" in chunk:
-                has_error = True
-            full_response += chunk
-            print(chunk, end="", flush=True)
+        # 输出缓冲：攒到一定长度或距上次刷新超过约 16ms 才真正写终端，
+        # 把每个 token 一次 write+flush 系统调用摊薄成每个时间窗一次；
+        # 16ms 远低于人眼可感知的延迟，观感与逐 token 刷新无异
+        out_buf = io.StringIO()
+        last_flush = time.monotonic()
+        # 出错走异常通道（StreamError），不再对每个数据块做子串扫描：
+        # 既省掉 O(token 数) 的字符串匹配，也不会误伤恰好包含
+        # “网络错误”字样的正常回答
+        try:
+            async for chunk in self.ai_service.astream_chat_completion(history_to_send):
+                parts.append(chunk)
+                out_buf.write(chunk)
+                now = time.monotonic()
+                if out_buf.tell() >= 64 or now - last_flush > 0.016:
+                    sys.stdout.write(out_buf.getvalue())
+                    sys.stdout.flush()
+                    out_buf.seek(0)
+                    out_buf.truncate()
+                    last_flush = now
+        except StreamError as e:
+            has_error = True
+            out_buf.write(f"\n{e}")
+        pending = out_buf.getvalue()
+        if pending:
+            sys.stdout.write(pending)
         print()
+        full_response = "".join(parts)
 
-        if not has_error:
-            conversation_history.append({"role": "assistant", "content": full_response})
+        if not has_error and memory_mode != 'no':
+            assistant_message = {"role": "assistant", "content": full_response}
+            conversation_history.append(assistant_message)
             if memory_mode == 'long':
-                self.memory_store.save(session_id, conversation_history)
-        
+                # 只把本轮新增的两条消息追加到 JSONL 文件末尾，
+                # 不再整体重写全部历史
+                self.memory_store.append(session_id, user_message)
+                self.memory_store.append(session_id, assistant_message)
+
         return conversation_history
 
-    def handle_gui_request(self, user_input, conversation_state, session_id):
-        """处理来自GUI的流式请求，作为生成器返回响应。"""
+    async def handle_gui_request(self, user_input, conversation_state, session_id):
+        """处理来自GUI的流式请求，作为异步生成器返回响应。
+
+        走 ai_service 的异步流式接口：等待网络时让出事件循环，
+        多个浏览器会话可以在同一进程里并发对话。
+        """
         session_id = self.memory_store.normalize_session_id(session_id)
-        conversation_state.append({"role": "user", "content": user_input})
+        user_message = {"role": "user", "content": user_input}
+        conversation_state.append(user_message)
 
-        full_response = ""
+        # 同 CLI：块列表 + join，避免字符串 += 的二次方拷贝；
+        # 只有在真正需要向前端推送时才拼接当前的累计文本
+        parts = []
         has_error = False
-        for chunk in self.ai_service.stream_chat_completion(conversation_state):
-            if "网络错误" in chunk or "未知错误" in chunk:
-                has_error = True
-            full_response += chunk
-            yield full_response
+        # 推送节流：每 50ms 最多向前端 yield 一次（约 20 帧/秒）。
+        # 每个 token 都推送的话，Gradio 要把整段聊天记录序列化过一遍
+        # WebSocket，肉眼却分辨不出差别
+        last_yield = 0.0
+        # 同 CLI：错误通过 StreamError 异常传达，正文通道只有正文
+        try:
+            async for chunk in self.ai_service.astream_chat_completion(_window(conversation_state)):
+                parts.append(chunk)
+                now = time.monotonic()
+                if now - last_yield >= 0.05:
+                    last_yield = now
+                    yield "".join(parts)
+        except StreamError as e:
+            has_error = True
+            parts.append(f"\n{e}")
+        full_response = "".join(parts)
+        # 收尾必须推送一次完整文本，保证节流不会吞掉最后一批 token
+        yield full_response
 
         if not has_error:
-            conversation_state.append({"role": "assistant", "content": full_response})
-            self.memory_store.save(session_id, conversation_state)
+            assistant_message = {"role": "assistant", "content": full_response}
+            conversation_state.append(assistant_message)
+            # 同 CLI：每轮只追加两条新消息，避免重写整个会话文件
+            self.memory_store.append(session_id, user_message)
+            self.memory_store.append(session_id, assistant_message)
     
     def switch_gui_session(self, requested_session, conversation_history, current_session_id):
         """处理GUI的会话切换请求。"""
@@ -88,6 +190,10 @@ class Orchestrator:
     def load_memory(self, session_id):
         """加载指定会话的历史记录。"""
         return self.memory_store.load(session_id)
+
+    async def preload_memory(self, limit=8):
+        """并发预载最近使用的几个会话（GUI 启动时调用一次）。"""
+        return await self.memory_store.preload(limit)
     
     def save_memory(self, session_id, history):
         """保存指定会话的历史记录。"""